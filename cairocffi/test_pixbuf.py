@@ -15,12 +15,17 @@ import zlib
 
 import pytest
 
-from . import constants, pixbuf
+from . import ImageSurface, constants, pixbuf
 
 PNG_BYTES = base64.b64decode(
     b'iVBORw0KGgoAAAANSUhEUgAAAAMAAAACCAYAAACddGYaAAAAE0lEQV'
     b'QI12NkaPjfwAAFTAxIAAAuNwIDqJbDRgAAAABJRU5ErkJggg==')
 
+# 2×1 RGBA image, with colors #102030 fully transparent then fully opaque
+ALPHA_PNG_BYTES = base64.b64decode(
+    b'iVBORw0KGgoAAAANSUhEUgAAAAIAAAABCAYAAAD0In+KAAAAD0lEQVR4nGMQUDBgAOL/'
+    b'AASIAcBZwNaYAAAAAElFTkSuQmCC')
+
 JPEG_BYTES = zlib.decompress(base64.b64decode(
     b'eJylzb0JgFAMBOA704hYvIC9oygIou7nPFq4g3+Nm0RT+iy9VPkIF9vsQhjavgVJdM/ATjS'
     b'+/YqX/O2gzdAUCUSoSJSitAUFiHdS1xArXBlr5qrf2wO58HkiigrlWK+T7TezChqU'))
@@ -36,6 +41,10 @@ def test_api():
     surface, format_name = pixbuf.decode_to_image_surface(PNG_BYTES)
     assert format_name == 'png'
     assert_decoded(surface)
+    surface, format_name = pixbuf.decode_to_image_surface(
+        memoryview(bytearray(PNG_BYTES)))
+    assert format_name == 'png'
+    assert_decoded(surface)
 
 
 def test_gdk():
@@ -43,7 +52,9 @@ def test_gdk():
         pytest.xfail()
     pixbuf_obj, format_name = pixbuf.decode_to_pixbuf(PNG_BYTES)
     assert format_name == 'png'
+    surface = pixbuf.pixbuf_to_cairo_gdk(pixbuf_obj)
     assert_decoded(pixbuf.pixbuf_to_cairo_gdk(pixbuf_obj))
+    assert_decoded(surface)
 
 
 def test_slices():
@@ -52,6 +63,64 @@ def test_slices():
     assert_decoded(pixbuf.pixbuf_to_cairo_png(pixbuf_obj))
 
 
+def test_slices_alpha(monkeypatch):
+    if pixbuf._import_numpy() is None:
+        pytest.xfail()
+    pixbuf_obj, format_name = pixbuf.decode_to_pixbuf(PNG_BYTES)
+    assert format_name == 'png'
+    assert_decoded(pixbuf.pixbuf_to_cairo_slices(pixbuf_obj))
+
+    # Alpha edge cases, fully transparent and fully opaque
+    pixbuf_obj, format_name = pixbuf.decode_to_pixbuf(ALPHA_PNG_BYTES)
+    assert format_name == 'png'
+    surface = pixbuf.pixbuf_to_cairo_slices(pixbuf_obj)
+    assert surface.get_width() == 2
+    assert surface.get_height() == 1
+    assert surface.get_format() == constants.FORMAT_ARGB32
+    transparent, opaque = b'\x00\x00\x00\x00', b'\xff\x10\x20\x30'
+    if sys.byteorder == 'little':  # pragma: no cover
+        transparent, opaque = transparent[::-1], opaque[::-1]
+    assert surface.get_data()[:] == transparent + opaque
+
+    # Without GDK, alpha images are converted without going through PNG
+    png_pixbufs = spy_pixbuf_to_cairo_png(monkeypatch)
+    monkeypatch.setattr(pixbuf, 'gdk', None)
+    surface, format_name = pixbuf.decode_to_image_surface(PNG_BYTES)
+    assert format_name == 'png'
+    assert not png_pixbufs
+    assert_decoded(surface)
+
+
+def test_slices_without_numpy(monkeypatch):
+    monkeypatch.setattr(pixbuf, 'numpy', None)
+    pixbuf_obj, format_name = pixbuf.decode_to_pixbuf(JPEG_BYTES)
+    assert format_name == 'jpeg'
+    assert pixbuf_obj.get_rowstride() > 3 * 3  # padded rows
+    surface = pixbuf.pixbuf_to_cairo_slices(pixbuf_obj)
+    assert surface.get_format() == constants.FORMAT_RGB24
+    assert surface.get_stride() == ImageSurface.format_stride_for_width(
+        constants.FORMAT_RGB24, 3)
+    assert_decoded(surface, constants.FORMAT_RGB24, b'\xff\x00\x80\xff')
+
+    # Rows without padding are converted in a single pass
+    pixbuf_obj, format_name = pixbuf.decode_to_pixbuf(JPEG_BYTES, 4, 2)
+    assert format_name == 'jpeg'
+    assert pixbuf_obj.get_rowstride() == 4 * 3
+    surface = pixbuf.pixbuf_to_cairo_slices(pixbuf_obj)
+    assert surface.get_format() == constants.FORMAT_RGB24
+    assert surface.get_stride() == 4 * 4
+    assert_decoded(
+        surface, constants.FORMAT_RGB24, b'\xff\x00\x80\xff', width=4)
+
+    # Images with an alpha channel still go through PNG
+    png_pixbufs = spy_pixbuf_to_cairo_png(monkeypatch)
+    monkeypatch.setattr(pixbuf, 'gdk', None)
+    surface, format_name = pixbuf.decode_to_image_surface(PNG_BYTES)
+    assert format_name == 'png'
+    assert len(png_pixbufs) == 1
+    assert_decoded(surface)
+
+
 def test_size():
     pixbuf_obj, format_name = pixbuf.decode_to_pixbuf(PNG_BYTES, 10, 10)
     assert format_name == 'png'
@@ -68,11 +137,24 @@ def test_png():
                    constants.FORMAT_RGB24, b'\xff\x00\x80\xff')
 
 
+def spy_pixbuf_to_cairo_png(monkeypatch):
+    """Return a list filled with the pixbufs converted through PNG."""
+    png_pixbufs = []
+    pixbuf_to_cairo_png = pixbuf.pixbuf_to_cairo_png
+
+    def spy(pixbuf_obj):
+        png_pixbufs.append(pixbuf_obj)
+        return pixbuf_to_cairo_png(pixbuf_obj)
+
+    monkeypatch.setattr(pixbuf, 'pixbuf_to_cairo_png', spy)
+    return png_pixbufs
+
+
 def assert_decoded(surface, format_=constants.FORMAT_ARGB32,
-                   rgba=b'\x80\x00\x40\x80'):
-    assert surface.get_width() == 3
-    assert surface.get_height() == 2
+                   rgba=b'\x80\x00\x40\x80', width=3, height=2):
+    assert surface.get_width() == width
+    assert surface.get_height() == height
     assert surface.get_format() == format_
     if sys.byteorder == 'little':  # pragma: no cover
         rgba = rgba[::-1]
-    assert surface.get_data()[:] == rgba * 6
+    assert surface.get_data()[:] == rgba * (width * height)